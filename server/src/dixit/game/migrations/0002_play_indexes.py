@@ -0,0 +1,21 @@
+# Generated by Django 3.0.4 on 2026-10-14 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='play',
+            index=models.Index(fields=['game_round', 'card_provided'], name='game_play_game_ro_c180ae_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='play',
+            index=models.Index(fields=['game_round', 'card_voted'], name='game_play_game_ro_ac7b23_idx'),
+        ),
+    ]
@@ -1,11 +1,15 @@
 
 import random
 from collections import defaultdict
+from functools import reduce
+from itertools import islice
+from operator import or_
 
-from django.db import models
-from django.core.exceptions import ObjectDoesNotExist
+from django.db import models, transaction
+from django.db.models import Count, Q
 from django.dispatch import receiver
 from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
 from django.utils.translation import ugettext as _
 
 from dixit import settings
@@ -55,22 +59,29 @@ class Round(models.Model):
     def __str__(self):
         return "{} of <Game {}: '{}'>".format(self.number, self.game.id, self.game.name)
 
+    @transaction.atomic
     def update_status(self):
-        players = self.game.players.exclude(id=self.turn.id)
-        plays = self.plays.all()
-        play_status = {p.player: p.status for p in plays}
+        # lock the round so concurrent plays don't race on the status transition
+        self.status = Round.objects.select_for_update().values_list('status', flat=True).get(pk=self.pk)
+
+        n_other_players = self.game.players.exclude(id=self.turn_id).count()
+        plays = list(self.plays.values_list('player_id', 'card_provided_id', 'card_voted_id'))
+        play_status = {
+            player_id: Play.get_status(self.turn_id, player_id, card_provided_id, card_voted_id)
+            for player_id, card_provided_id, card_voted_id in plays
+        }
         status = RoundStatus.COMPLETE
 
         # if storyteller is the only one who has played, the round is still new
         # since other players may join
-        if not plays or play_status.keys() == {self.turn, }:
+        if not plays or play_status.keys() == {self.turn_id, }:
             status = RoundStatus.NEW
 
-        elif len(plays) - 1 < len(players):
+        elif len(plays) - 1 < n_other_players:
             # if any player other than storyteller has started, round is ongoing
             status = RoundStatus.PROVIDING
 
-        elif any(s == RoundStatus.VOTING for s in play_status.values()):
+        elif PlayStatus.VOTING in play_status.values():
             # round is voting until all players other than the storyteller have voted.
             # Note that there can't be a providing and voting plays at the same time.
             status = RoundStatus.VOTING
@@ -87,36 +98,39 @@ class Round(models.Model):
         lose a single card per round, so no calculation should be necessary. However,
         this method allows us to deal the initial hand to all players.
         """
-        cards_available = list(Card.objects.available_for_game(self.game))
-        current_players = self.game.players.all().select_related()
+        hand_size_limit = settings.GAME_HAND_SIZE
+        available_ids = list(Card.objects.available_for_game(self.game).values_list('id', flat=True))
+        hand_sizes = dict(self.game.players.annotate(hand_size=Count('cards'))
+                                           .values_list('id', 'hand_size'))
 
         card_deals = {
-            'system': 1 if not self.card else 0,
+            'system': 0 if self.card_id else 1,
             # if the storyteller is the only one playing, we need to make sure we have
             # enough cards to deal a joining player.
-            'player': settings.GAME_HAND_SIZE if current_players.count() == 1 else 0
+            'player': hand_size_limit if len(hand_sizes) == 1 else 0
         }
 
-        for player in current_players:
-            card_deals[player] = settings.GAME_HAND_SIZE - player.cards.count()
+        for player_id, hand_size in hand_sizes.items():
+            card_deals[player_id] = max(0, hand_size_limit - hand_size)
 
         cards_needed = sum(card_deals.values())
-        if cards_needed > len(cards_available):
+        if cards_needed > len(available_ids):
             raise GameDeckExhausted("Not enough cards to deal round", round=self)
 
-        def get_choice(seq):
-            idx = random.randint(0, len(seq) - 1)
-            return seq.pop(idx)
+        dealt_ids = iter(random.sample(available_ids, cards_needed))
 
-        for player in current_players:
-            cards = [get_choice(cards_available) for i in range(card_deals[player])]
-            player.cards.add(*cards)
+        PlayerCard = Player.cards.through
+        PlayerCard.objects.bulk_create([
+            PlayerCard(player_id=player_id, card_id=card_id)
+            for player_id in hand_sizes
+            for card_id in islice(dealt_ids, card_deals[player_id])
+        ])
 
-        if not self.card:
+        if not self.card_id:
             # TODO
             # If the round dealt the system card after the storyteller had given the
             # description, a smarter choice could me made.
-            self.card = get_choice(cards_available)
+            self.card_id = next(dealt_ids)
             return self.save()
 
     def close(self):
@@ -135,36 +149,46 @@ class Round(models.Model):
               that chooses their card
             - The players get GAME_MAX_ROUND_SCORE maximum points
         """
-        from dixit.game.models.round import RoundStatus
-
         if self.status != RoundStatus.COMPLETE:
             raise GameRoundIncomplete('still waiting for players')
 
-        plays = self.plays.all()
-        players_plays = plays.exclude(player=self.turn)
+        plays = list(self.plays.all())
+        players_plays = [p for p in plays if p.player_id != self.turn_id]
+
+        story_play = next((p for p in plays if p.player_id == self.turn_id), None)
+        if story_play is None:
+            raise GameRoundIncomplete('the storyteller has not played')
+
+        story_card_id = story_play.card_provided_id
+        card_to_player_id = {p.card_provided_id: p.player_id for p in plays}
+        scores = defaultdict(int)
+        story_guesses = 0
 
-        story_card = plays.get(player=self.turn).card_provided
-        scores = defaultdict(lambda: 0)
-        guesses = {p.player: 0 for p in players_plays}
+        guess_score = settings.GAME_GUESS_SCORE
+        confused_guess_score = settings.GAME_CONFUSED_GUESS_SCORE
+        max_round_score = settings.GAME_MAX_ROUND_SCORE
 
         for play in players_plays:
-            if play.card_voted == story_card:
-                scores[play.player] += settings.GAME_GUESS_SCORE
-                guesses[play.player] = True
+            if play.card_voted_id == story_card_id:
+                scores[play.player_id] += guess_score
+                story_guesses += 1
             else:
-                if play.card_voted != self.card:
-                    chosen_play = plays.get(card_provided=play.card_voted, game_round=self)
-                    scores[chosen_play.player] += settings.GAME_CONFUSED_GUESS_SCORE
+                if play.card_voted_id != self.card_id:
+                    scores[card_to_player_id[play.card_voted_id]] += confused_guess_score
 
-            play.player.cards.remove(play.card_provided)
-        self.turn.cards.remove(story_card)
+        played_cards = (Q(player_id=p.player_id, card_id=p.card_provided_id) for p in plays)
+        Player.cards.through.objects.filter(reduce(or_, played_cards)).delete()
 
-        if any(guesses.values()) and not all(guesses.values()):
-            scores[self.turn] = settings.GAME_STORY_SCORE
+        if 0 < story_guesses < len(players_plays):
+            scores[self.turn_id] = settings.GAME_STORY_SCORE
 
-        for player, score in scores.items():
-            player.score += min(settings.GAME_MAX_ROUND_SCORE, score)
-            player.save()
+        players = Player.objects.in_bulk(scores.keys())
+        modified_on = timezone.now()
+        for player_id, score in scores.items():
+            player = players[player_id]
+            player.score += min(max_round_score, score)
+            player.modified_on = modified_on
+        Player.objects.bulk_update(players.values(), ('score', 'modified_on'), batch_size=100)
 
         # TODO:
         # Update cards descriptions
@@ -211,16 +235,28 @@ class Play(models.Model):
 
         order_with_respect_to = 'player'
         unique_together = (('game_round', 'player'), )
+        indexes = [
+            models.Index(fields=['game_round', 'card_provided']),
+            models.Index(fields=['game_round', 'card_voted']),
+        ]
 
     @property
     def status(self):
-        if self.player == self.game_round.turn:
-            if self.card_provided:
+        return self.get_status(self.game_round.turn_id, self.player_id,
+                               self.card_provided_id, self.card_voted_id)
+
+    @staticmethod
+    def get_status(turn_id, player_id, card_provided_id, card_voted_id):
+        """
+        Computes a play status from its ids, so it can be used on plain query values
+        """
+        if player_id == turn_id:
+            if card_provided_id:
                 return PlayStatus.COMPLETE
             return PlayStatus.PROVIDING
-        if not self.card_provided:
+        if not card_provided_id:
             return PlayStatus.PROVIDING
-        elif not self.card_voted:
+        elif not card_voted_id:
             return PlayStatus.VOTING
         return PlayStatus.COMPLETE
 
@@ -243,17 +279,15 @@ class Play(models.Model):
         elif self.game_round.status == RoundStatus.VOTING:
             raise GameInvalidPlay('can not change the card, voting has started')
 
-        elif story is None and self.player == self.game_round.turn:
+        elif story is None and self.player_id == self.game_round.turn_id:
             raise GameInvalidPlay('the storyteller needs to provide a story')
 
-        elif card not in self.player.cards.all():
+        elif not self.player.cards.filter(pk=card.pk).exists():
             raise GameInvalidPlay('the card is not available to player')
 
-        elif self.player != self.game_round.turn:
-            try:
-                self.game_round.plays.get(player=self.game_round.turn)
-            except ObjectDoesNotExist:
-                raise GameInvalidPlay('can not provide a card without a story first')
+        elif (self.player_id != self.game_round.turn_id and
+                not self.game_round.plays.filter(player_id=self.game_round.turn_id).exists()):
+            raise GameInvalidPlay('can not provide a card without a story first')
 
         self.card_provided = card
         self.save()
@@ -268,7 +302,7 @@ class Play(models.Model):
         if self.game_round.status == RoundStatus.COMPLETE:
             raise GameInvalidPlay('the round is closed')
 
-        elif self.player == self.game_round.turn:
+        elif self.player_id == self.game_round.turn_id:
             raise GameInvalidPlay('storytellers can not choose any cards')
 
         elif self.game_round.status != RoundStatus.VOTING:
@@ -277,8 +311,7 @@ class Play(models.Model):
         elif card == self.card_provided:
             raise GameInvalidPlay('player can not choose their own card')
 
-        round_cards = set(Card.objects.played_for_round(self.game_round))
-        if card not in round_cards:
+        if not Card.objects.played_for_round(self.game_round).filter(pk=card.pk).exists():
             raise GameInvalidPlay('the chosen card is not being played in this round')
 
         self.card_voted = card
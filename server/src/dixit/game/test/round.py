@@ -188,6 +188,31 @@ class RoundTest(TestCase):
         with self.assertRaises(GameDeckExhausted):
             new_round.deal()
 
+    def test_deal_tolerates_hands_over_the_limit(self):
+        extra_card = Card.objects.available_for_game(self.game)[0]
+        self.player2.cards.add(extra_card)
+
+        game_round = Round(game=self.game, number=self.current.number + 1, turn=self.current.turn)
+        game_round.deal()
+
+        self.assertEqual(self.player2.cards.count(), settings.GAME_HAND_SIZE + 1)
+        self.assertEqual(self.player3.cards.count(), settings.GAME_HAND_SIZE)
+
+    def test_round_without_story_play_can_not_be_closed(self):
+        story_card = self.current.turn._pick_card()
+        Play.play_for_round(self.current, self.current.turn, story_card, 'test')
+        players = self.game.players.all().exclude(id=self.game.storyteller.id)
+        for player in players:
+            Play.play_for_round(self.current, player, player._pick_card())
+
+        plays = self.current.plays.all().exclude(player=self.game.storyteller)
+        for play in plays:
+            play.vote_card(story_card)
+
+        self.assertEqual(self.current.status, RoundStatus.COMPLETE)
+        self.current.turn = self.game.add_player(self.user4, 'player4')
+        self.assertRaises(GameRoundIncomplete, self.current.close)
+
     def test_new_round_can_not_be_closed(self):
         self.assertEqual(self.current.status, RoundStatus.NEW)
         self.assertRaises(GameRoundIncomplete, self.current.close)
@@ -304,3 +329,23 @@ class RoundTest(TestCase):
 
         self.player2.refresh_from_db()
         self.assertEqual(self.player2.score, settings.GAME_MAX_ROUND_SCORE)
+
+    def test_close_removes_played_cards_from_hands(self):
+        story_card = self.current.turn._pick_card()
+        story_play = Play.play_for_round(self.current, self.current.turn, story_card, 'test')
+
+        card2 = self.player2._pick_card()
+        play2 = Play.play_for_round(self.current, self.player2, card2)
+
+        card3 = self.player3._pick_card()
+        play3 = Play.play_for_round(self.current, self.player3, card3)
+
+        play2.vote_card(story_card)
+        play3.vote_card(card2)
+
+        self.current.close()
+
+        self.assertFalse(self.current.turn.cards.filter(id=story_card.id).exists())
+        self.assertFalse(self.player2.cards.filter(id=card2.id).exists())
+        self.assertFalse(self.player3.cards.filter(id=card3.id).exists())
+        self.assertEqual(self.player2.cards.count(), settings.GAME_HAND_SIZE - 1)